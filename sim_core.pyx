@@ -0,0 +1,116 @@
+# cython: language_level=3, boundscheck=False, wraparound=False, cdivision=True
+#
+# Ahead-of-time compiled copy of _sim_core from run_simulation.py, used when
+# Numba is not installed. Keep the two kernels in step.
+#
+# Build in place with:  cythonize -i sim_core.pyx
+
+import numpy as np
+
+from libc.math cimport fabs, fmax, fmin
+
+
+cdef inline double fast_tanh(double u) nogil:
+    cdef double u2 = u * u
+    cdef double p = u * (135135.0 + u2 * (17325.0 + u2 * (378.0 + u2)))
+    cdef double q = 135135.0 + u2 * (62370.0 + u2 * (3150.0 + u2 * 28.0))
+    return fmin(fmax(p / q, -1.0), 1.0)
+
+
+cdef inline double soft_clip(double x, double xmin, double xmax) nogil:
+    cdef double mid = 0.5 * (xmin + xmax)
+    cdef double span = 0.5 * (xmax - xmin)
+    return mid + span * fast_tanh((x - mid) / span)
+
+
+def sim_core(const double[:, ::1] roads, double INV_MS, double INV_MU,
+             double KS, double KT, double C_MIN, double C_MAX, double DT,
+             Py_ssize_t DELAY_STEPS,
+             double g_lf, double g_hf, double g_g, double g_a):
+
+    cdef Py_ssize_t N = roads.shape[0]
+    cdef Py_ssize_t P = roads.shape[1]
+    cdef Py_ssize_t i, j
+    cdef Py_ssize_t head = 0
+    cdef Py_ssize_t mask = DELAY_STEPS - 1
+
+    cdef double r, c_act, f_spring, f_damper, f_tire, a_s, a_u
+    cdef double v_s_hf, rel_vel, c_target, lf_on
+    cdef double half_dt = 0.5 * DT
+
+    # States
+    cdef double[::1] z_s = np.zeros(P)
+    cdef double[::1] v_s = np.zeros(P)
+    cdef double[::1] z_u = np.zeros(P)
+    cdef double[::1] v_u = np.zeros(P)
+
+    zs_arr = np.empty((N, P))
+    zu_arr = np.empty((N, P))
+    acc_s_arr = np.empty((N, P))
+    cdef double[:, ::1] zs_hist = zs_arr
+    cdef double[:, ::1] zu_hist = zu_arr
+    cdef double[:, ::1] acc_s_hist = acc_s_arr
+
+    # Filters
+    cdef double[::1] v_s_lf = np.zeros(P)
+    cdef double[::1] v_u_lf = np.zeros(P)
+
+    # Actuator delay buffer
+    cdef double[:, ::1] c_buffer = np.full((DELAY_STEPS, P), C_MIN)
+
+    # Half-step velocities
+    cdef double[::1] v_s_half = np.zeros(P)
+    cdef double[::1] v_u_half = np.zeros(P)
+
+    with nogil:
+        for i in range(N):
+
+            for j in range(P):
+
+                r = roads[i, j]
+                c_act = c_buffer[head, j]
+
+                # Forces
+                f_spring = KS * (z_s[j] - z_u[j])
+                f_damper = c_act * (v_s[j] - v_u[j])
+                f_tire   = KT * (z_u[j] - r)
+
+                # Accelerations
+                a_s = -(f_spring + f_damper) * INV_MS
+                a_u = (f_spring + f_damper - f_tire) * INV_MU
+
+                # Store histories
+                zs_hist[i, j] = z_s[j]
+                zu_hist[i, j] = z_u[j]
+                acc_s_hist[i, j] = a_s
+
+                # Controller (frequency-selective skyhook)
+                v_s_lf[j] += 0.05 * (v_s[j] - v_s_lf[j])
+                v_u_lf[j] += 0.15 * (v_u[j] - v_u_lf[j])
+
+                v_s_hf = v_s[j] - v_s_lf[j]
+                rel_vel = v_s[j] - v_u[j]
+
+                c_target = C_MIN
+
+                lf_on = <double>(v_s_lf[j] * rel_vel > 0.0)
+                c_target += lf_on * g_lf * fabs(v_s_lf[j])
+                c_target += g_hf * fabs(v_s_hf)
+                c_target += g_g * fabs(v_u_lf[j])
+                c_target += g_a * fabs(a_s)
+
+                c_buffer[head, j] = soft_clip(c_target, C_MIN, C_MAX)
+
+                # Integration (trapezoidal)
+                v_s[j] = v_s_half[j] + a_s * half_dt
+                v_u[j] = v_u_half[j] + a_u * half_dt
+
+                z_s[j] += v_s[j] * DT
+                z_u[j] += v_u[j] * DT
+
+                v_s_half[j] = v_s[j] + a_s * half_dt
+                v_u_half[j] = v_u[j] + a_u * half_dt
+
+            head = (head + 1) & mask
+
+    return zs_arr, zu_arr, acc_s_arr